@@ -1,6 +1,7 @@
+import os
 import random
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
 
 import matplotlib.pyplot as plt
 
@@ -8,10 +9,15 @@ from src.utils import (
     Position,
     Robot,
     animate_solution,
+    disk_cache,
     solve_warehouse_problem,
     visualize_solution_grid,
 )
 
+# Figures are regenerated from fixed instances, so their solutions are
+# cached on disk; the complexity benchmark always calls the solver
+cached_solve_warehouse_problem = disk_cache(".sat_cache")(solve_warehouse_problem)
+
 
 def randomize_warehouse():
     """
@@ -56,7 +62,9 @@ def randomize_warehouse():
     time_horizon = 32
 
     # Solve the problem
-    paths = solve_warehouse_problem(width, height, robots, obstacles, time_horizon)
+    paths = cached_solve_warehouse_problem(
+        width, height, robots, obstacles, time_horizon
+    )
 
     if paths:
         visualize_solution_grid(
@@ -109,7 +117,9 @@ def basic_warehouse():
     time_horizon = 16
 
     # Solve the problem
-    paths = solve_warehouse_problem(width, height, robots, obstacles, time_horizon)
+    paths = cached_solve_warehouse_problem(
+        width, height, robots, obstacles, time_horizon
+    )
 
     if paths:
         visualize_solution_grid(
@@ -130,6 +140,10 @@ def worker_simulation(width, height, num, time_horizon):
     Run a single simulation of the warehouse problem and return
     a tuple with key (width, num) and the elapsed solver time.
     """
+    # Seed from the configuration so every run and every worker generates the
+    # same instance for it, whichever process picks the task up
+    random.seed(f"{width}x{height}/{num}")
+
     # Generate robots with unique start/goal positions.
     robots = []
     used_positions = set()
@@ -158,7 +172,9 @@ def worker_simulation(width, height, num, time_horizon):
         if pos not in forbidden:
             obstacles.add(pos)
 
-    # Measure solver execution time.
+    # Measure solver execution time. The uncached solver is used on purpose:
+    # a cache hit would time the lookup instead of the solver, and every
+    # (size, robots) configuration of a sweep is solved only once anyway
     start_time = time.perf_counter()
     paths = solve_warehouse_problem(width, height, robots, obstacles, time_horizon)
     elapsed = time.perf_counter() - start_time
@@ -181,16 +197,21 @@ def test_complexity():
 
     results = {}  # key: (warehouse_width, num_robots), value: execution time
 
+    tasks = [
+        (width, height, num, time_horizon)
+        for width, height in sizes
+        for num in robot_counts
+    ]
+    max_workers = os.cpu_count() or 1
+    # Batch tasks to cut pickling round trips, while leaving every worker a few
+    # chunks so the slow large instances do not all land in one batch
+    chunksize = max(1, len(tasks) // (4 * max_workers))
+
     # Parallelize simulation using ProcessPoolExecutor.
-    with ProcessPoolExecutor(max_workers=4) as executor:
-        futures = []
-        for width, height in sizes:
-            for num in robot_counts:
-                futures.append(
-                    executor.submit(worker_simulation, width, height, num, time_horizon)
-                )
-        for future in as_completed(futures):
-            key, elapsed = future.result()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for key, elapsed in executor.map(
+            worker_simulation, *zip(*tasks), chunksize=chunksize
+        ):
             results[key] = elapsed
 
     # Plot the results: one curve per warehouse size.
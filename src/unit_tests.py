@@ -4,6 +4,10 @@
 import pytest
 from typing import Set, List, Dict
 from main import Position, Robot, solve_warehouse_problem
+import shelve
+from pysat.solvers import Minisat22
+from src.utils import build_planner, disk_cache, problem_key, solve_minimum_horizon, solve_warehouse_horizons
+from src.warehouse_path_planner import WarehousePathPlanner
 
 def test_basic_movement():
     """Test simple movement from start to goal without obstacles."""
@@ -143,5 +147,218 @@ def test_passing_possible():
     assert paths[1][-1] == Position(1, 0)
     assert paths[2][-1] == Position(0, 0)
 
+def test_huge_robot_coordinates():
+    """Test that coordinates too large for a machine int are rejected as out of bounds."""
+    with pytest.raises(ValueError, match="Robot 1 start position is outside"):
+        robots = [Robot(1, Position(10**20, 0), Position(1, 1))]
+        solve_warehouse_problem(3, 3, robots, set(), 5)
+
+    with pytest.raises(ValueError, match="Robot 1 goal position is outside"):
+        robots = [Robot(1, Position(0, 0), Position(0, -10**20))]
+        solve_warehouse_problem(3, 3, robots, set(), 5)
+
+def test_constraint_order():
+    """Test that the constraints can be added to the planner in any order."""
+    robots = [Robot(1, Position(0, 0), Position(2, 1))]
+    planner = WarehousePathPlanner(3, 2, 4, robots)
+    planner.add_movement_constraints(robots)
+    planner.add_collision_avoidance(robots)
+    # Positions pinned after clauses mentioning them were emitted
+    planner.add_initial_positions(robots)
+    planner.add_goal_positions(robots)
+    planner.add_obstacle_constraints({Position(1, 0)}, robots)
+
+    paths = planner.solve_paths()
+    assert paths is not None
+    assert paths[1][0] == Position(0, 0)
+    assert paths[1][-1] == Position(2, 1)
+    assert Position(1, 0) not in paths[1]
+
+def test_horizon_sweep():
+    """Test that one incremental solver answers every horizon of a sweep."""
+    width, height = 3, 3
+    robots = [
+        Robot(1, Position(0, 0), Position(2, 2)),
+        Robot(2, Position(2, 2), Position(0, 0)),
+    ]
+    obstacles = {Position(1, 1)}
+
+    results = solve_warehouse_horizons(width, height, robots, obstacles, range(1, 7))
+
+    for time_horizon, paths in results.items():
+        # Each horizon agrees with a standalone solve
+        expected = solve_warehouse_problem(
+            width, height, robots, obstacles, time_horizon
+        )
+        assert (paths is None) == (expected is None)
+        if paths is not None:
+            for robot in robots:
+                assert len(paths[robot.id]) == time_horizon + 1
+                assert paths[robot.id][0] == robot.start
+                assert paths[robot.id][-1] == robot.goal
+    assert results[3] is None
+    assert results[4] is not None
+
+def test_minimum_horizon():
+    """Test that the binary search finds the first solvable horizon of the sweep."""
+    width, height = 3, 3
+    robots = [
+        Robot(1, Position(0, 0), Position(2, 2)),
+        Robot(2, Position(2, 2), Position(0, 0)),
+    ]
+    obstacles = {Position(1, 1)}
+
+    time_horizon, paths = solve_minimum_horizon(width, height, robots, obstacles, 8)
+    assert time_horizon == 4
+    assert paths[1][-1] == Position(2, 2)
+    assert paths[2][-1] == Position(0, 0)
+    # No solvable horizon in range
+    assert solve_minimum_horizon(width, height, robots, obstacles, 3) is None
+
+    # The same search through solve_warehouse_problem, where the range replaces
+    # the time horizon and the paths take the length of the horizon found
+    paths = solve_warehouse_problem(width, height, robots, obstacles, t_range=(2, 8))
+    assert len(paths[1]) == 5
+    assert solve_warehouse_problem(width, height, robots, obstacles, 8, t_range=(2, 8)) == paths
+    assert (
+        solve_warehouse_problem(width, height, robots, obstacles, 3, t_range=(0, 3))
+        is None
+    )
+
+    # Inconsistent ranges are rejected
+    for time_horizon, t_range in [(8, (9, 8)), (0, (-1, 8)), (0, (2, 8)), (9, (2, 8))]:
+        with pytest.raises(ValueError):
+            solve_warehouse_problem(
+                width, height, robots, obstacles, time_horizon, t_range=t_range
+            )
+    # Without a range the time horizon is required
+    with pytest.raises(ValueError):
+        solve_warehouse_problem(width, height, robots, obstacles)
+
+def test_assumption_horizon_range():
+    """Test that goal assumptions reject horizons outside the encoded range."""
+    robots = [
+        Robot(1, Position(0, 0), Position(1, 0)),
+        Robot(2, Position(1, 1), Position(0, 1))
+    ]
+    planner = build_planner(2, 2, robots, set(), 3, fix_goals=False)
+
+    assert len(planner.goal_assumptions(robots, 3)) == 2
+    for time_horizon in [-1, 4]:
+        with pytest.raises(ValueError):
+            planner.goal_assumptions(robots, time_horizon)
+        with pytest.raises(ValueError):
+            planner.deadline_assumptions(robots, time_horizon)
+
+def test_solver_class():
+    """Test that the paths do not depend on the pysat solver class used."""
+    width, height = 3, 3
+    robots = [
+        Robot(1, Position(0, 0), Position(2, 2)),
+        Robot(2, Position(2, 2), Position(0, 0))
+    ]
+    obstacles = {Position(1, 1)}
+
+    paths = solve_warehouse_problem(width, height, robots, obstacles, 4, solver_cls=Minisat22)
+    assert paths is not None
+    for robot in robots:
+        assert paths[robot.id][0] == robot.start
+        assert paths[robot.id][-1] == robot.goal
+        assert obstacles.isdisjoint(paths[robot.id])
+    # A single-robot corridor has exactly one solution
+    robots = [Robot(1, Position(0, 0), Position(2, 0))]
+    assert (
+        solve_warehouse_problem(3, 1, robots, set(), 2, solver_cls=Minisat22)
+        == solve_warehouse_problem(3, 1, robots, set(), 2)
+        == {1: [Position(0, 0), Position(1, 0), Position(2, 0)]}
+    )
+
+def test_reachability_pruning():
+    """Test that pruning unreachable positions keeps the tightest horizon solvable."""
+    width, height = 3, 3
+    robots = [Robot(1, Position(0, 0), Position(2, 0))]
+    # The wall forces a detour of 6 moves around (1, 2)
+    obstacles = {Position(1, 0), Position(1, 1)}
+
+    planner = build_planner(width, height, robots, obstacles, 6)
+    distances = planner.distances([planner.encode(0, 0)])
+    assert distances[0, planner.encode(2, 0)] == 6
+    assert distances[0, planner.encode(1, 0)] > 6  # Obstacles are walls
+
+    assert solve_warehouse_problem(width, height, robots, obstacles, 5) is None
+    paths = solve_warehouse_problem(width, height, robots, obstacles, 6)
+    assert paths is not None
+    assert paths[1][3] == Position(1, 2)
+
+def test_lazy_conflicts():
+    """Test that lazily added collision and switching constraints still hold."""
+    corridor = [
+        Robot(1, Position(0, 0), Position(1, 0)),
+        Robot(2, Position(1, 0), Position(0, 0)),
+    ]
+    # Swapping in a corridor stays impossible, passing in a 2-high one is found
+    assert solve_warehouse_problem(2, 1, corridor, set(), 3, lazy=True) is None
+    paths = solve_warehouse_problem(2, 2, corridor, set(), 4, lazy=True)
+    assert paths is not None
+    for t in range(5):
+        assert paths[1][t] != paths[2][t]
+        if t:
+            assert (paths[1][t], paths[2][t]) != (paths[2][t - 1], paths[1][t - 1])
+
+
+def test_problem_key():
+    """Test that cache keys ignore input ordering but not the problem itself."""
+    robots = [
+        Robot(1, Position(0, 0), Position(1, 1)),
+        Robot(2, Position(1, 0), Position(0, 1)),
+    ]
+    obstacles = [Position(2, 2), Position(2, 0)]
+
+    key = problem_key(3, 3, robots, set(obstacles), 4)
+    assert key == problem_key(3, 3, robots[::-1], set(obstacles[::-1]), 4)
+    assert key != problem_key(3, 3, robots, set(obstacles), 5)
+    assert key != problem_key(3, 3, robots, {Position(2, 2)}, 4)
+
+def test_disk_cache(tmp_path, monkeypatch):
+    """Test that solutions, including unsolvable ones, are cached in memory and on disk."""
+    filename = str(tmp_path / "sat_cache")
+    calls = []
+
+    def solve(width, height, robots, obstacles, time_horizon):
+        calls.append((width, height))
+        return solve_warehouse_problem(width, height, robots, obstacles, time_horizon)
+
+    cached_solve = disk_cache(filename)(solve)
+    robots = [
+        Robot(1, Position(0, 0), Position(1, 0)),
+        Robot(2, Position(1, 0), Position(0, 0))
+    ]
+
+    # Unsolvable instances are cached too
+    assert cached_solve(2, 1, robots, set(), 3) is None
+    assert cached_solve(2, 1, robots, set(), 3) is None
+    assert calls == [(2, 1)]
+
+    paths = cached_solve(2, 2, robots, set(), 4)
+    assert paths is not None
+    # A new wrapper reads the results back from the file
+    assert disk_cache(filename)(solve)(2, 2, robots, set(), 4) == paths
+    assert calls == [(2, 1), (2, 2)]
+
+    # Repeated problems are answered from memory without opening the file
+    def no_file(*args, **kwargs):
+        raise AssertionError("cache file opened")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(shelve, "open", no_file)
+        assert cached_solve(2, 2, robots, set(), 4) == paths
+
+    # Entries that fail to load are solved again and overwritten
+    with shelve.open(filename) as cache:
+        cache.dict[problem_key(2, 2, robots, set(), 4).encode()] = b"not a pickle"
+    assert disk_cache(filename)(solve)(2, 2, robots, set(), 4) == paths
+    assert disk_cache(filename)(solve)(2, 2, robots, set(), 4) == paths
+    assert calls == [(2, 1), (2, 2), (2, 2)]
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
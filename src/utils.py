@@ -1,32 +1,51 @@
-from typing import Dict, List, Optional, Set
+import hashlib
+import pickle
+import shelve
+from functools import lru_cache, wraps
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 import matplotlib.patches as patches
 import matplotlib.pyplot as plt
+import numpy as np
 import seaborn as sns
 from matplotlib import animation
+from matplotlib.collections import LineCollection, PatchCollection
+from pysat.solvers import Glucose3
 
 from src.warehouse_path_planner import Position, Robot, WarehousePathPlanner
 
 
-def solve_warehouse_problem(
+@lru_cache(maxsize=None)
+def robot_palette(num_robots: int) -> List:
+    """Return the husl palette used for `num_robots` robots, built once per size."""
+    return sns.color_palette("husl", num_robots)
+
+
+def grid_segments(width: int, height: int) -> List:
+    """Return the vertical and horizontal line segments outlining the grid cells."""
+    return [[(x, 0), (x, height)] for x in range(width + 1)] + [
+        [(0, y), (width, y)] for y in range(height + 1)
+    ]
+
+
+def build_planner(
     width: int,
     height: int,
     robots: List[Robot],
     obstacles: Set[Position],
     time_horizon: int,
-) -> Optional[Dict[int, List[Position]]]:
+    fix_goals: bool = True,
+    solver_cls: Callable = Glucose3,
+    lazy: bool = False,
+) -> WarehousePathPlanner:
     """
-    Solve the warehouse path planning problem.
+    Validate the problem and encode it into a planner.
 
-    Args:
-        width: Width of the warehouse grid
-        height: Height of the warehouse grid
-        robots: List of robots with their start and goal positions
-        obstacles: Set of obstacle positions
-        time_horizon: Maximum number of time steps allowed
-
-    Returns:
-        Dictionary mapping robot IDs to their paths if a solution exists, None otherwise
+    With `fix_goals=False` the goals are left out of the encoding, so they can
+    be passed to `WarehousePathPlanner.solve` as assumptions at any time step up
+    to `time_horizon`. `solver_cls` is the pysat solver class used to solve it.
+    With `lazy=True` collision and switching constraints are left out, to be
+    added on demand by `WarehousePathPlanner.solve_paths`.
     """
     # Input validation
     if width <= 0 or height <= 0:
@@ -46,32 +65,265 @@ def solve_warehouse_problem(
             raise ValueError(
                 f"Robot {robot.id} goal position is outside the warehouse bounds"
             )
-        if Position(robot.start.x, robot.start.y) in obstacles:
+        if robot.start in obstacles:
             raise ValueError(
                 f"Robot {robot.id} start position overlaps with an obstacle"
             )
-        if Position(robot.goal.x, robot.goal.y) in obstacles:
+        if robot.goal in obstacles:
             raise ValueError(
                 f"Robot {robot.id} goal position overlaps with an obstacle"
             )
 
-    planner = WarehousePathPlanner(width, height, time_horizon)
+    planner = WarehousePathPlanner(width, height, time_horizon, robots, solver_cls)
 
     # Add all constraints
     planner.add_initial_positions(robots)
-    planner.add_goal_positions(robots)
+    if fix_goals:
+        planner.add_goal_positions(robots)
     planner.add_obstacle_constraints(obstacles, robots)
+    # Goal distances only apply while the goals are pinned at the horizon
+    planner.add_reachability_constraints(robots, goals=fix_goals)
     planner.add_movement_constraints(robots)
-    planner.add_collision_avoidance(robots)
-    planner.add_position_switching_prohibition(robots)
+    if not lazy:
+        planner.add_collision_avoidance(robots)
+        planner.add_position_switching_prohibition(robots)
+    return planner
+
+
+def solve_warehouse_problem(
+    width: int,
+    height: int,
+    robots: List[Robot],
+    obstacles: Set[Position],
+    time_horizon: Optional[int] = None,
+    solver_cls: Callable = Glucose3,
+    t_range: Optional[Tuple[int, int]] = None,
+    lazy: bool = False,
+) -> Optional[Dict[int, List[Position]]]:
+    """
+    Solve the warehouse path planning problem.
+
+    Args:
+        width: Width of the warehouse grid
+        height: Height of the warehouse grid
+        robots: List of robots with their start and goal positions
+        obstacles: Set of obstacle positions
+        time_horizon: Maximum number of time steps allowed. Optional when
+            `t_range` is given; if both are given it must lie within the range
+        solver_cls: pysat solver class to use (Glucose3 by default)
+        t_range: Optional (min, max) range of time horizons, searched instead of
+            solving `time_horizon` alone; the paths of the smallest solvable
+            horizon in the range are returned, found by binary search on one
+            incremental solver. Their length is that horizon + 1, which can be
+            shorter than `time_horizon` + 1
+        lazy: Add collision and switching constraints only once the solver
+            returns paths that violate them
+
+    Returns:
+        Dictionary mapping robot IDs to their paths if a solution exists, None otherwise
+    """
+    if t_range is not None:
+        t_min, t_max = t_range
+        if t_min < 0 or t_min > t_max:
+            raise ValueError(f"Invalid time horizon range {t_range}")
+        if time_horizon is not None and not t_min <= time_horizon <= t_max:
+            raise ValueError(
+                f"Time horizon {time_horizon} is outside the range {t_range}"
+            )
+        result = solve_minimum_horizon(
+            width, height, robots, obstacles, t_max, t_min, solver_cls, lazy
+        )
+        return None if result is None else result[1]
+    if time_horizon is None:
+        raise ValueError("Either a time horizon or a time horizon range is required")
+
+    planner = build_planner(
+        width, height, robots, obstacles, time_horizon, solver_cls=solver_cls, lazy=lazy
+    )
+    try:
+        # Solve the problem and decode the solution
+        return planner.solve_paths()
+    finally:
+        planner.close()
+
+
+def solve_warehouse_horizons(
+    width: int,
+    height: int,
+    robots: List[Robot],
+    obstacles: Set[Position],
+    time_horizons: Iterable[int],
+    solver_cls: Callable = Glucose3,
+    lazy: bool = False,
+) -> Dict[int, Optional[Dict[int, List[Position]]]]:
+    """
+    Solve the warehouse problem for several time horizons with one solver.
+
+    The problem is encoded once for the largest horizon and each horizon only
+    changes the goal assumptions, so clauses learnt on one horizon are reused on
+    the next. Robots that arrive early can always wait on their goals, which
+    makes this equivalent to solving every horizon separately.
+
+    Returns:
+        Dictionary mapping each horizon to its paths, or None if unsolvable
+    """
+    time_horizons = list(time_horizons)
+    if not time_horizons:
+        return {}
+    if any(time_horizon < 0 for time_horizon in time_horizons):
+        raise ValueError("Time horizon must be non-negative")
+    planner = build_planner(
+        width,
+        height,
+        robots,
+        obstacles,
+        max(time_horizons),
+        fix_goals=False,
+        solver_cls=solver_cls,
+        lazy=lazy,
+    )
+
+    results = {}
+    try:
+        for time_horizon in time_horizons:
+            results[time_horizon] = planner.solve_paths(
+                planner.deadline_assumptions(robots, time_horizon), time_horizon
+            )
+    finally:
+        planner.close()
+    return results
+
+
+def solve_minimum_horizon(
+    width: int,
+    height: int,
+    robots: List[Robot],
+    obstacles: Set[Position],
+    max_horizon: int,
+    min_horizon: int = 0,
+    solver_cls: Callable = Glucose3,
+    lazy: bool = False,
+) -> Optional[Tuple[int, Dict[int, List[Position]]]]:
+    """
+    Find the smallest time horizon in [min_horizon, max_horizon] that admits a
+    solution, by binary search over one incremental solver.
+
+    Solvability is monotone in the horizon, since robots that arrive early can
+    wait on their goals, and no horizon below the longest shortest path from a
+    start to its goal needs to be probed.
+
+    Returns:
+        The minimum horizon and its paths, or None if no horizon in the range
+        is solvable
+    """
+    planner = build_planner(
+        width,
+        height,
+        robots,
+        obstacles,
+        max_horizon,
+        fix_goals=False,
+        solver_cls=solver_cls,
+        lazy=lazy,
+    )
 
-    # Solve the problem
-    solution = planner.solve()
-    if solution is None:
-        return None
+    try:
+        starts = [planner.encode(robot.start.x, robot.start.y) for robot in robots]
+        goals = [planner.encode(robot.goal.x, robot.goal.y) for robot in robots]
+        shortest = planner.distances(starts)[np.arange(len(robots)), goals].max()
+        low, high = max(min_horizon, int(min(shortest, max_horizon + 1))), max_horizon
+        best = None
+        while low <= high:
+            time_horizon = (low + high) // 2
+            paths = planner.solve_paths(
+                planner.deadline_assumptions(robots, time_horizon), time_horizon
+            )
+            if paths is None:
+                low = time_horizon + 1
+            else:
+                best = time_horizon, paths
+                high = time_horizon - 1
+    finally:
+        planner.close()
+    return best
+
+
+# Format of the results stored by disk_cache. Bump it whenever the pickled
+# paths change shape (e.g. the Position class), so older entries are missed
+CACHE_VERSION = 2
+
+# Errors raised when loading an entry pickled by an incompatible version
+CACHE_LOAD_ERRORS = (
+    pickle.UnpicklingError,
+    AttributeError,
+    EOFError,
+    ImportError,
+    IndexError,
+    TypeError,
+    ValueError,
+)
+
+
+def problem_key(
+    width: int,
+    height: int,
+    robots: List[Robot],
+    obstacles: Set[Position],
+    time_horizon: int,
+) -> str:
+    """Return a hash identifying the problem regardless of input ordering."""
+    canonical = (
+        CACHE_VERSION,
+        width,
+        height,
+        sorted(
+            (robot.id, robot.start.x, robot.start.y, robot.goal.x, robot.goal.y)
+            for robot in robots
+        ),
+        sorted((obstacle.x, obstacle.y) for obstacle in obstacles),
+        time_horizon,
+    )
+    return hashlib.blake2b(repr(canonical).encode()).hexdigest()
+
+
+def disk_cache(filename: str = ".sat_cache") -> Callable:
+    """
+    Decorate a solver with the signature of `solve_warehouse_problem` so that
+    its results (including unsolvable instances) are stored in a shelve file
+    and reused for identical problems. Results are also kept in memory, so
+    repeated problems within a process do not reopen the file. Entries that
+    fail to load, e.g. written before a format change, are solved again.
+    """
 
-    # Decode and return the solution
-    return planner.decode_solution(solution)
+    def decorator(solve: Callable) -> Callable:
+        memory = {}
+
+        @wraps(solve)
+        def cached_solve(width, height, robots, obstacles, time_horizon):
+            key = problem_key(width, height, robots, obstacles, time_horizon)
+            if key in memory:
+                return memory[key]
+            with shelve.open(filename) as cache:
+                try:
+                    paths = cache[key]
+                except KeyError:
+                    pass
+                except CACHE_LOAD_ERRORS:
+                    # Unreadable entries count as misses and are overwritten
+                    pass
+                else:
+                    memory[key] = paths
+                    return paths
+
+            paths = solve(width, height, robots, obstacles, time_horizon)
+            with shelve.open(filename) as cache:
+                cache[key] = paths
+            memory[key] = paths
+            return paths
+
+        return cached_solve
+
+    return decorator
 
 
 def test_simple_case():
@@ -83,27 +335,29 @@ def test_simple_case():
     robots = [Robot(1, Position(0, 0), Position(1, 1))]
     obstacles = set()  # No obstacles
 
-    # Try with different time horizons
-    for time_horizon in range(1, 4):
+    # Try with different time horizons, sharing one incremental solver
+    time_horizons = range(1, 4)
+    try:
+        results = solve_warehouse_horizons(
+            width, height, robots, obstacles, time_horizons
+        )
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+
+    for time_horizon in time_horizons:
         print(f"\nTrying simple case with time horizon = {time_horizon}")
-        try:
-            paths = solve_warehouse_problem(
-                width, height, robots, obstacles, time_horizon
-            )
+        paths = results[time_horizon]
 
-            if paths:
-                print("Solution found!")
-                for robot_id, path in sorted(paths.items()):
-                    print(f"Robot {robot_id} path:")
-                    for t, pos in enumerate(path):
-                        move_type = (
-                            "stay" if (t > 0 and path[t] == path[t - 1]) else "move"
-                        )
-                        print(f"Time {t}: ({pos.x}, {pos.y}) - {move_type}")
-            else:
-                print(f"No solution found for time horizon {time_horizon}")
-        except Exception as e:
-            print(f"Error: {e}")
+        if paths:
+            print("Solution found!")
+            for robot_id, path in sorted(paths.items()):
+                print(f"Robot {robot_id} path:")
+                for t, pos in enumerate(path):
+                    move_type = "stay" if (t > 0 and path[t] == path[t - 1]) else "move"
+                    print(f"Time {t}: ({pos.x}, {pos.y}) - {move_type}")
+        else:
+            print(f"No solution found for time horizon {time_horizon}")
 
 
 def animate_solution(
@@ -119,93 +373,113 @@ def animate_solution(
     fig, ax = plt.subplots(figsize=(10, 10))
 
     max_time = max(len(path) for path in paths.values())
-    colors = sns.color_palette("husl", len(robots))
+    colors = robot_palette(len(robots))
 
-    def update(t):
-        ax.clear()
-
-        # Draw grid and obstacles
-        for x in range(width):
-            for y in range(height):
-                ax.add_patch(
-                    patches.Rectangle(
-                        (x, y), 1, 1, fill=False, edgecolor="gray", lw=0.5
-                    )
-                )
+    # Draw the static grid and obstacles once instead of on every frame
+    ax.add_collection(
+        LineCollection(
+            grid_segments(width, height), colors="gray", linewidths=0.5, zorder=1
+        )
+    )
+    ax.add_collection(
+        PatchCollection(
+            [patches.Rectangle((obs.x, obs.y), 1, 1) for obs in obstacles],
+            color="black",
+        )
+    )
+    ax.set_xlim(0, width)
+    ax.set_ylim(0, height)
+    ax.set_aspect("equal")
 
-        for obs in obstacles:
-            ax.add_patch(patches.Rectangle((obs.x, obs.y), 1, 1, color="black"))
+    # Create every robot artist up front; frames only toggle or move them
+    robot_artists = []
+    for i, robot in enumerate(robots):
+        path = paths[robot.id]
+        robot_color = colors[i]
 
-        # Draw paths and robots up to current time t
-        for i, robot in enumerate(robots):
-            path = paths[robot.id]
-            current_t = min(t, len(path) - 1)
-            robot_color = colors[i]
+        # Coordinates are unpacked from the path once; frames index the arrays
+        xs = np.fromiter((pos.x for pos in path), dtype=np.int32, count=len(path))
+        ys = np.fromiter((pos.y for pos in path), dtype=np.int32, count=len(path))
+        centers = np.column_stack((xs, ys)) + 0.5
 
-            # Draw path history and timesteps
-            for j in range(current_t):
-                pos = path[j]
-                next_pos = path[j + 1]
-                ax.arrow(
-                    pos.x + 0.5,
-                    pos.y + 0.5,
-                    next_pos.x - pos.x,
-                    next_pos.y - pos.y,
-                    head_width=0.2,
-                    head_length=0.2,
-                    fc=robot_color,
-                    ec=robot_color,
-                    alpha=0.3,
-                )
-                ax.text(pos.x + 0.1, pos.y + 0.1, str(j), color=robot_color, fontsize=8)
-
-            # Draw current robot position
-            current_pos = path[current_t]
-            ax.add_patch(
-                patches.Circle(
-                    (current_pos.x + 0.5, current_pos.y + 0.5), 0.3, color=robot_color
-                )
-            )
+        # Path history as one line collection over precomputed segments,
+        # truncated to the current time step on every frame
+        segments = np.stack((centers[:-1], centers[1:]), axis=1)
+        trail = ax.add_collection(
+            LineCollection([], colors=[robot_color], linewidths=2, alpha=0.3)
+        )
+        step_labels = [
             ax.text(
-                current_pos.x + 0.5,
-                current_pos.y + 0.5,
-                str(robot.id),
-                ha="center",
-                va="center",
-                color="white",
+                x + 0.1,
+                y + 0.1,
+                str(j),
+                color=robot_color,
+                fontsize=8,
+                visible=False,
             )
+            for j, (x, y) in enumerate(zip(xs[:-1].tolist(), ys[:-1].tolist()))
+        ]
+
+        # Current robot position
+        marker = ax.add_patch(patches.Circle(tuple(centers[0]), 0.3, color=robot_color))
+        marker_label = ax.text(
+            *centers[0],
+            str(robot.id),
+            ha="center",
+            va="center",
+            color="white",
+        )
 
-            # Mark start and goal
-            ax.add_patch(
-                patches.Circle(
-                    (robot.start.x + 0.5, robot.start.y + 0.5),
-                    0.2,
-                    color=robot_color,
-                    alpha=0.5,
-                )
+        # Mark start and goal
+        ax.add_patch(
+            patches.Circle(
+                (robot.start.x + 0.5, robot.start.y + 0.5),
+                0.2,
+                color=robot_color,
+                alpha=0.5,
             )
-            ax.add_patch(
-                patches.Circle(
-                    (robot.goal.x + 0.5, robot.goal.y + 0.5),
-                    0.2,
-                    color=robot_color,
-                    alpha=0.5,
-                )
+        )
+        ax.add_patch(
+            patches.Circle(
+                (robot.goal.x + 0.5, robot.goal.y + 0.5),
+                0.2,
+                color=robot_color,
+                alpha=0.5,
             )
+        )
+
+        robot_artists.append(
+            (centers, len(path) - 1, segments, trail, step_labels, marker, marker_label)
+        )
+
+    def update(t):
+        for (
+            centers,
+            last_t,
+            segments,
+            trail,
+            step_labels,
+            marker,
+            marker_label,
+        ) in robot_artists:
+            current_t = min(t, last_t)
+            trail.set_segments(segments[:current_t])
+            for j, step_label in enumerate(step_labels):
+                step_label.set_visible(j < current_t)
+
+            current_center = tuple(centers[current_t])
+            marker.center = current_center
+            marker_label.set_position(current_center)
 
-        ax.set_xlim(0, width)
-        ax.set_ylim(0, height)
-        ax.set_aspect("equal")
         ax.set_title(f"Time step: {t}")
 
-    anim = animation.FuncAnimation(
-        fig,
-        update,  # type: ignore
-        frames=max_time + 1,
-        interval=500,
-        repeat=False,
-    )
-    anim.save(filename, writer="pillow")
+    # Frames go straight to the writer: Animation.save redraws the whole
+    # figure once to flush every frame and once more to grab it
+    writer = animation.PillowWriter(fps=2)
+    with writer.saving(fig, filename, fig.dpi):
+        for t in range(max_time + 1):
+            update(t)
+            writer.grab_frame()
     plt.close()
 
 
@@ -227,7 +501,14 @@ def visualize_solution_grid(
     fig, axes = plt.subplots(rows, cols, figsize=(6 * cols, 6 * rows))
     axes = axes.flatten()  # Flatten for easy iteration
 
-    colors = sns.color_palette("husl", num_robots)  # Assign unique colors for robots
+    colors = robot_palette(num_robots)  # Assign unique colors for robots
+
+    # Shared background: grid lines and an RGBA obstacle image (black, opaque
+    # on obstacle cells and transparent elsewhere), rendered per subplot
+    grid_lines = grid_segments(width, height)
+    obstacle_image = np.zeros((height, width, 4))
+    for obs in obstacles:
+        obstacle_image[obs.y, obs.x, 3] = 1.0
 
     for i, robot in enumerate(robots):
         ax = axes[i]
@@ -236,17 +517,18 @@ def visualize_solution_grid(
         path = paths[robot_id]
 
         # Draw grid
-        for x in range(width):
-            for y in range(height):
-                ax.add_patch(
-                    patches.Rectangle(
-                        (x, y), 1, 1, fill=False, edgecolor="gray", lw=0.5
-                    )
-                )
+        ax.add_collection(
+            LineCollection(grid_lines, colors="gray", linewidths=0.5, zorder=1)
+        )
 
         # Draw obstacles
-        for obs in obstacles:
-            ax.add_patch(patches.Rectangle((obs.x, obs.y), 1, 1, color="black"))
+        ax.imshow(
+            obstacle_image,
+            extent=(0, width, 0, height),
+            origin="lower",
+            interpolation="nearest",
+            zorder=1,
+        )
 
         # Draw robot's path
         for t, pos in enumerate(path):
@@ -328,4 +610,6 @@ def visualize_solution_grid(
         axes[j].axis("off")
 
     plt.tight_layout()
-    plt.savefig(figure_filename)
+    # Figure.savefig renders once; pyplot.savefig redraws the whole figure
+    # again afterwards
+    fig.savefig(figure_filename)
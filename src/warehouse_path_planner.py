@@ -1,23 +1,27 @@
-import itertools
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
+import numpy as np
 from pysat.formula import CNF
 from pysat.solvers import Glucose3
 
 
-@dataclass(frozen=True)  # Making Position immutable and hashable
-class Position:
+class Position(NamedTuple):
+    # A tuple subclass: immutable, with hashing and equality implemented in C
     x: int
     y: int
 
-    def __hash__(self):
-        return hash((self.x, self.y))
+    @classmethod
+    @lru_cache(maxsize=None)
+    def of(cls, x: int, y: int) -> "Position":
+        """Return the shared (interned) Position for (x, y)."""
+        return cls(x, y)
 
-    def __eq__(self, other):
-        if not isinstance(other, Position):
-            return NotImplemented
-        return self.x == other.x and self.y == other.y
+
+# Valid movements: stay, up, right, down, left. A tuple, so it can key the
+# lru_cached grid tables directly
+MOVES: Tuple[Tuple[int, int], ...] = ((0, 0), (0, 1), (1, 0), (0, -1), (-1, 0))
 
 
 @dataclass
@@ -27,190 +31,621 @@ class Robot:
     goal: Position
 
 
+@lru_cache(maxsize=None)
+def build_neighbor_tables(
+    width: int, height: int, directions: Tuple[Tuple[int, int], ...]
+) -> np.ndarray:
+    """
+    Compute the neighbors of every packed cell in one vectorized pass.
+
+    Returns a read-only (num_cells, len(directions)) array whose columns follow
+    `directions`, with -1 where the move would leave the grid.
+    """
+    num_cells = width * height
+    xs, ys = np.divmod(np.arange(num_cells, dtype=np.int64), height)
+    table = np.full((num_cells, len(directions)), -1, dtype=np.int64)
+    for k, (dx, dy) in enumerate(directions):
+        next_xs, next_ys = xs + dx, ys + dy
+        # Reinterpreted as unsigned, negative coordinates wrap to huge values,
+        # so a single comparison per axis covers both bounds
+        valid = (next_xs.view(np.uint64) < width) & (next_ys.view(np.uint64) < height)
+        table[valid, k] = next_xs[valid] * height + next_ys[valid]
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=None)
+def build_edge_list(
+    width: int, height: int, directions: Tuple[Tuple[int, int], ...]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    List the directed edges of the grid once per shape.
+
+    Returns read-only arrays of edge sources, edge targets and, for every edge,
+    the index of the edge going the opposite way.
+    """
+    table = build_neighbor_tables(width, height, directions)
+    num_cells = width * height
+    sources, columns = np.nonzero(table >= 0)
+    targets = table[sources, columns]
+    keys = sources * num_cells + targets
+    order = np.argsort(keys)
+    reverse = order[np.searchsorted(keys[order], targets * num_cells + sources)]
+    for array in (sources, targets, reverse):
+        array.flags.writeable = False
+    return sources, targets, reverse
+
+
 class WarehousePathPlanner:
-    def __init__(self, width: int, height: int, time_horizon: int):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        time_horizon: int,
+        robots: List[Robot],
+        solver_cls: Callable = Glucose3,
+    ):
         self.width = width
         self.height = height
         self.time_horizon = time_horizon
+        self.robots = robots
+        self.robot_index = {robot.id: i for i, robot in enumerate(robots)}
         self.cnf = CNF()
-        self.var_map = {}
-        self.next_var = 1
-        # Valid movements: stay, up, right, down, left
-        self.moves = [(0, 0), (0, 1), (1, 0), (0, -1), (-1, 0)]
+        # Cells are packed into a single int (x * height + y) inside the planner
+        self.num_cells = width * height
+        # Position variables are laid out as 1 + ((r * (T + 1) + t) * W + x) * H + y,
+        # auxiliary variables are allocated after that block
+        self.robot_stride = (time_horizon + 1) * self.num_cells
+        self.num_position_vars = len(robots) * self.robot_stride
+        self.next_var = self.num_position_vars + 1
+        # The same layout as a (robot, time, cell) tensor, so clause generators
+        # can slice variable ids instead of computing them one by one
+        self.position_vars = np.arange(
+            1, self.num_position_vars + 1, dtype=np.int64
+        ).reshape(len(robots), time_horizon + 1, self.num_cells)
+        # Values known before solving (pinned starts/goals and cells ruled out
+        # by obstacles) per position variable: 1 true, -1 false, 0 free.
+        # Clauses are simplified against them as they are emitted
+        self.position_values = np.zeros(self.num_position_vars, dtype=np.int8)
+        # Set when simplification derives the empty clause
+        self.conflict = False
+        # Incremental solver (any pysat solver class, e.g. Cadical195), kept
+        # between solve calls together with the number of clauses it has
+        # already been given
+        self.solver_cls = solver_cls
+        self.solver = None
+        self.num_loaded_clauses = 0
+        # Selector literal per horizon, see deadline_assumptions
+        self.deadlines = {}
+        # Obstacle layout
+        self.obstacle_mask = np.zeros((width, height), dtype=bool)
+        # Packed cells that are not obstacles; constraint generators only
+        # emit clauses over these
+        self.open_cells = np.arange(self.num_cells)
+        # Groups with at most this many free variables use the pairwise
+        # at-most-one encoding, which needs fewer clauses up to n = 6
+        self.pairwise_amo_limit = 6
+        # Encoding of larger groups: "ladder" (3n clauses, n auxiliaries) or
+        # "binary" (n * log2(n) clauses, log2(n) auxiliaries)
+        self.amo_encoding = "ladder"
+        self.moves = MOVES
+        # Neighbor tables only depend on the grid shape and are shared between
+        # planners, so horizon sweeps and repeated solves build them once
+        self.neighbor_table = build_neighbor_tables(width, height, self.moves[1:])
+        self.edge_sources, self.edge_targets, self.edge_reverse = build_edge_list(
+            width, height, self.moves[1:]
+        )
+
+    def encode(self, x: int, y: int) -> int:
+        """Pack grid coordinates into a single cell index."""
+        return x * self.height + y
 
     def create_variable(self, robot_id: int, x: int, y: int, t: int) -> int:
-        """Create a variable representing robot's position at time t."""
-        key = f"R{robot_id}X{x}Y{y}T{t}"  # Removed underscore separator
-        if key not in self.var_map:
-            self.var_map[key] = self.next_var
-            self.next_var += 1
-        return self.var_map[key]
+        """Return the variable representing robot's position at time t."""
+        return (
+            1
+            + self.robot_index[robot_id] * self.robot_stride
+            + t * self.num_cells
+            + x * self.height
+            + y
+        )
+
+    def _robot_vars(self, robots: List[Robot]) -> np.ndarray:
+        """Return the (robot, time, cell) position variables of `robots`."""
+        return self.position_vars[[self.robot_index[robot.id] for robot in robots]]
+
+    def fix_literals(self, literals: np.ndarray):
+        """
+        Record position `literals` as true.
+
+        Values fixed before any clause is emitted need no unit clauses, since
+        every clause is simplified against them. Clauses emitted earlier may
+        still mention the newly fixed variables, so in that case the values
+        are also added as unit clauses and the constraints can be added in any
+        order.
+        """
+        literals = np.asarray(literals, dtype=np.int64).ravel()
+        indices = np.abs(literals) - 1
+        signs = np.sign(literals).astype(np.int8)
+        if (self.position_values[indices] == -signs).any():
+            self.conflict = True
+        if self.cnf.clauses:
+            new = np.unique(literals[self.position_values[indices] == 0])
+            self.cnf.clauses.extend(new[:, np.newaxis].tolist())
+        self.position_values[indices] = signs
+
+    def add_clauses(self, literals: np.ndarray):
+        """
+        Add one clause per row of `literals`, where 0 marks an unused slot.
+
+        Clauses are simplified against the fixed position values first: those
+        already satisfied are dropped and falsified literals are removed.
+        """
+        literals = np.asarray(literals, dtype=np.int64)
+        if literals.size == 0:
+            return
+        variables = np.abs(literals)
+        values = np.zeros(literals.shape, dtype=np.int8)
+        positional = (variables > 0) & (variables <= self.num_position_vars)
+        values[positional] = self.position_values[variables[positional] - 1]
+        values[literals < 0] *= -1
+
+        open_rows = ~(values == 1).any(axis=1)
+        literals = literals[open_rows]
+        keep = (literals != 0) & (values[open_rows] != -1)
+        lengths = keep.sum(axis=1)
+        if (lengths == 0).any():
+            self.conflict = True
+
+        # Rows of equal length are reshaped back into clauses in one go
+        for length in np.unique(lengths[lengths > 0]).tolist():
+            rows = lengths == length
+            self.cnf.clauses.extend(
+                literals[rows][keep[rows]].reshape(-1, length).tolist()
+            )
+        if literals.size:
+            self.cnf.nv = max(self.cnf.nv, int(variables.max()))
+
+    def add_clause(self, clause: List[int]):
+        """Add a single clause, simplified against the fixed position values."""
+        self.add_clauses([clause])
 
     def add_initial_positions(self, robots: List[Robot]):
-        """Add constraints for initial positions of all robots."""
-        for robot in robots:
-            # Add positive clause for start position
-            start_var = self.create_variable(robot.id, robot.start.x, robot.start.y, 0)
-            self.cnf.append([start_var])
-
-            # Add "at most one position" constraints
-            for x in range(self.width):
-                for y in range(self.height):
-                    var = self.create_variable(robot.id, x, y, 0)
-                    if x != robot.start.x or y != robot.start.y:
-                        self.cnf.append([-var])  # Cannot be at any other position
+        """Fix the position of every robot at time 0 to its start."""
+        start_vars = self._robot_vars(robots)[:, 0]
+        starts = [self.encode(robot.start.x, robot.start.y) for robot in robots]
+        literals = -start_vars
+        literals[np.arange(len(robots)), starts] *= -1
+        self.fix_literals(literals)
 
     def add_goal_positions(self, robots: List[Robot]):
-        """Add constraints for goal positions of all robots."""
-        for robot in robots:
-            # Add positive clause for goal position
-            goal_var = self.create_variable(
-                robot.id, robot.goal.x, robot.goal.y, self.time_horizon
-            )
-            self.cnf.append([goal_var])
-
-            # Add "at most one position" constraints for final time step
-            for x in range(self.width):
-                for y in range(self.height):
-                    if x != robot.goal.x or y != robot.goal.y:
-                        var = self.create_variable(robot.id, x, y, self.time_horizon)
-                        self.cnf.append([-var])
+        """Fix the position of every robot at the time horizon to its goal."""
+        goal_vars = self._robot_vars(robots)[:, self.time_horizon]
+        goals = [self.encode(robot.goal.x, robot.goal.y) for robot in robots]
+        literals = -goal_vars
+        literals[np.arange(len(robots)), goals] *= -1
+        self.fix_literals(literals)
 
     def add_obstacle_constraints(self, obstacles: Set[Position], robots: List[Robot]):
         """Add constraints preventing robots from occupying obstacle positions."""
+        obstacle_mask = np.zeros((self.width, self.height), dtype=bool)
         for obstacle in obstacles:
             if not (0 <= obstacle.x < self.width and 0 <= obstacle.y < self.height):
                 raise ValueError(
                     f"Obstacle at position ({obstacle.x}, {obstacle.y}) is outside the warehouse bounds"
                 )
-
-            for robot in robots:
-                for t in range(self.time_horizon + 1):
-                    var = self.create_variable(robot.id, obstacle.x, obstacle.y, t)
-                    self.cnf.append([-var])
+            obstacle_mask[obstacle.x, obstacle.y] = True
+
+        self.obstacle_mask = obstacle_mask
+        self.open_cells = np.flatnonzero(~self.obstacle_mask)
+
+        obstacle_cells = np.flatnonzero(self.obstacle_mask)
+        self.fix_literals(-self._robot_vars(robots)[:, :, obstacle_cells])
+
+    def distances(self, cells: Sequence[int]) -> np.ndarray:
+        """
+        Return the number of moves from each of `cells` to every cell, with
+        obstacles as walls, as a (len(cells), num_cells) array.
+
+        Unreachable cells get a distance larger than any time step.
+        """
+        unreachable = np.iinfo(np.int64).max
+        distance = np.full((len(cells), self.num_cells), unreachable, dtype=np.int64)
+        # The extra always-false column absorbs the -1 entries of the table
+        reached = np.zeros((len(cells), self.num_cells + 1), dtype=bool)
+        reached[np.arange(len(cells)), cells] = True
+        distance[np.arange(len(cells)), cells] = 0
+        open_cells = ~self.obstacle_mask.ravel()
+        for step in range(1, self.num_cells):
+            grown = reached[:, self.neighbor_table].any(axis=2) & open_cells
+            new = grown & ~reached[:, :-1]
+            if not new.any():
+                break
+            distance[new] = step
+            reached[:, :-1] |= new
+        return distance
+
+    def add_reachability_constraints(self, robots: List[Robot], goals: bool = True):
+        """
+        Rule out positions a robot cannot reach in time.
+
+        A robot is at most t moves away from its start at time t and, if
+        `goals` is set, at most T - t moves away from its goal. Obstacles must
+        already be added, and the pruned variables are fixed to false before
+        any clause over them is emitted.
+        """
+        times = np.arange(self.time_horizon + 1)[:, np.newaxis]
+        starts = [self.encode(robot.start.x, robot.start.y) for robot in robots]
+        unreachable = self.distances(starts)[:, np.newaxis, :] > times
+        if goals:
+            targets = [self.encode(robot.goal.x, robot.goal.y) for robot in robots]
+            unreachable |= (
+                self.distances(targets)[:, np.newaxis, :] > self.time_horizon - times
+            )
+        self.fix_literals(-self._robot_vars(robots)[unreachable])
 
     def add_movement_constraints(self, robots: List[Robot]):
         """Add constraints for valid movements between time steps."""
-        for robot in robots:
-            for t in range(self.time_horizon + 1):
-                # At each time step, robot must be at exactly one position
-                positions_at_t = []
-                for x in range(self.width):
-                    for y in range(self.height):
-                        var = self.create_variable(robot.id, x, y, t)
-                        positions_at_t.append(var)
-
-                # At least one position
-                self.cnf.append(positions_at_t)
-
-                # At most one position
-                for pos1, pos2 in itertools.combinations(positions_at_t, 2):
-                    self.cnf.append([-pos1, -pos2])
-
-                # If not the last time step, add movement constraints
-                if t < self.time_horizon:
-                    for x in range(self.width):
-                        for y in range(self.height):
-                            current_pos = self.create_variable(robot.id, x, y, t)
-
-                            # Generate valid next positions (including staying in place)
-                            next_positions = []
-                            for (
-                                dx,
-                                dy,
-                            ) in self.moves:  # includes (0,0) for staying in place
-                                next_x, next_y = x + dx, y + dy
-                                if (
-                                    0 <= next_x < self.width
-                                    and 0 <= next_y < self.height
-                                ):
-                                    next_pos = self.create_variable(
-                                        robot.id, next_x, next_y, t + 1
-                                    )
-                                    next_positions.append(next_pos)
-
-                            # If at current position, must move to one of valid next positions
-                            if next_positions:
-                                self.add_implication(current_pos, next_positions)
+        robot_vars = self._robot_vars(robots)
+        open_vars = robot_vars[:, :, self.open_cells]
+
+        # At each time step, robot must be at exactly one position. At least
+        # one position is only required at t = 0 (where the fixed start
+        # already satisfies it): the movement implications below carry it
+        # over to every later step
+        self.add_clauses(open_vars[:, 0])
+        self._at_most_one(open_vars.reshape(-1, len(self.open_cells)))
+
+        # If at a cell at time t, the robot must be at the same cell or at one
+        # of its neighbors at t + 1; -1 entries of the neighbor table become
+        # unused clause slots
+        successors = np.column_stack(
+            (self.open_cells, self.neighbor_table[self.open_cells])
+        )
+        next_positions = robot_vars[:, 1:, successors]
+        next_positions[:, :, successors < 0] = 0
+        current = open_vars[:, :-1, :, np.newaxis]
+        self.add_clauses(
+            np.concatenate((-current, next_positions), axis=-1).reshape(
+                -1, 1 + successors.shape[1]
+            )
+        )
 
     def add_collision_avoidance(self, robots: List[Robot]):
         """Add constraints preventing robots from occupying the same position or crossing paths."""
-        # Vertex collision avoidance
-        for t in range(self.time_horizon + 1):
-            for x in range(self.width):
-                for y in range(self.height):
-                    # No two robots can be at the same position at the same time
-                    robot_vars = []
-                    for robot in robots:
-                        var = self.create_variable(robot.id, x, y, t)
-                        robot_vars.append(var)
-
-                    # At most one robot can be at any position
-                    for var1, var2 in itertools.combinations(robot_vars, 2):
-                        self.cnf.append([-var1, -var2])
+        # Vertex collision avoidance: at most one robot at any (time, cell)
+        robot_vars = self._robot_vars(robots)[:, :, self.open_cells]
+        self._at_most_one(robot_vars.transpose(1, 2, 0).reshape(-1, len(robots)))
 
     def add_position_switching_prohibition(self, robots: List[Robot]):
         """Add constraints preventing robots from switching positions."""
-        for t in range(self.time_horizon):
-            for x1 in range(self.width):
-                for y1 in range(self.height):
-                    for dx, dy in self.moves[1:]:  # Exclude staying in place
-                        x2, y2 = x1 + dx, y1 + dy
-                        if 0 <= x2 < self.width and 0 <= y2 < self.height:
-                            for r1, r2 in itertools.combinations(robots, 2):
-                                # Variables for positions at time t
-                                r1_pos1_t = self.create_variable(r1.id, x1, y1, t)
-                                r2_pos2_t = self.create_variable(r2.id, x2, y2, t)
-
-                                # Variables for positions at time t+1
-                                r1_pos2_t1 = self.create_variable(r1.id, x2, y2, t + 1)
-                                r2_pos1_t1 = self.create_variable(r2.id, x1, y1, t + 1)
-
-                                # Prevent position switching
-                                self.cnf.append(
-                                    [-r1_pos1_t, -r2_pos2_t, -r1_pos2_t1, -r2_pos1_t1]
-                                )
-
-    def add_implication(self, antecedent: int, consequents: List[int]):
-        """Add A → (B₁ ∨ B₂ ∨ ... ∨ Bₙ) constraint."""
-        self.cnf.append([-antecedent] + consequents)
-
-    def solve(self) -> Optional[Dict[str, bool]]:
-        """Solve the SAT problem and return the solution if one exists."""
-        with Glucose3() as solver:
-            solver.append_formula(self.cnf.clauses)
-
-            if solver.solve():
-                model = solver.get_model()
-                if not isinstance(model, list):
-                    raise ValueError("No model found")
-
-                return {
-                    var_name: lit > 0
-                    for var_name, var_num in self.var_map.items()
-                    for lit in model
-                    if abs(lit) == var_num
-                }
-
+        if len(robots) < 2:
+            return
+        robot_vars = self._robot_vars(robots)
+        cells, targets = self.edge_sources, self.edge_targets
+        blocked = self.obstacle_mask.ravel()
+        open_edges = np.flatnonzero(~blocked[cells] & ~blocked[targets])
+
+        # One auxiliary variable per open directed edge u -> v and time step,
+        # forced true whenever any robot moves along it
+        flow = np.zeros((self.time_horizon, len(cells)), dtype=np.int64)
+        flow[:, open_edges] = self.next_var + np.arange(
+            self.time_horizon * len(open_edges), dtype=np.int64
+        ).reshape(self.time_horizon, len(open_edges))
+        self.next_var += self.time_horizon * len(open_edges)
+        self.add_clauses(
+            np.stack(
+                np.broadcast_arrays(
+                    -robot_vars[:, :-1, cells[open_edges]],
+                    -robot_vars[:, 1:, targets[open_edges]],
+                    flow[:, open_edges],
+                ),
+                axis=-1,
+            ).reshape(-1, 3)
+        )
+
+        # Two robots swapping would use an edge in both directions at once, so
+        # at most one direction of every undirected edge may carry a robot.
+        # The reverse of an open edge is open as well
+        reverse = self.edge_reverse
+        forward = open_edges[cells[open_edges] < targets[open_edges]]
+        self.add_clauses(
+            -np.stack((flow[:, forward], flow[:, reverse[forward]]), axis=-1).reshape(
+                -1, 2
+            )
+        )
+
+    def _new_aux(self) -> int:
+        """Allocate a fresh auxiliary variable."""
+        var = self.next_var
+        self.next_var += 1
+        return var
+
+    def _at_most_one(self, groups: np.ndarray):
+        """
+        Add an at-most-one constraint over each row of `groups`.
+
+        Variables fixed to false are left out, since they can never violate
+        the constraint. Small groups use the pairwise encoding, larger ones the
+        encoding named by `amo_encoding`.
+        """
+        groups = np.asarray(groups, dtype=np.int64).reshape(-1, np.shape(groups)[-1])
+        free = self.position_values[groups - 1] != -1
+        counts = free.sum(axis=1)
+        # Groups with fewer than two free variables need no clauses at all
+        small = (counts >= 2) & (counts <= self.pairwise_amo_limit)
+        large = counts > self.pairwise_amo_limit
+        self._amo_pairwise(groups[small], free[small])
+        encodings = {"ladder": self._amo_ladder, "binary": self._amo_binary}
+        if self.amo_encoding not in encodings:
+            raise ValueError(f"Unknown at-most-one encoding: {self.amo_encoding}")
+        encodings[self.amo_encoding](groups[large], free[large])
+
+    def _amo_pairwise(self, groups: np.ndarray, free: np.ndarray):
+        """
+        Add the pairwise at-most-one encoding over the `free` variables of each
+        row of `groups`, one binary clause per pair.
+        """
+        if len(groups) == 0:
+            return
+        # Move the free variables of every row to the front, negated once
+        limit = min(self.pairwise_amo_limit, groups.shape[1])
+        order = np.argsort(~free, axis=1, kind="stable")[:, :limit]
+        negated = -np.take_along_axis(groups, order, axis=1)
+        negated[~np.take_along_axis(free, order, axis=1)] = 0
+
+        first, second = np.triu_indices(limit, 1)
+        clauses = np.stack((negated[:, first], negated[:, second]), axis=-1)
+        self.add_clauses(clauses[(clauses != 0).all(axis=-1)])
+
+    def _amo_binary(self, groups: np.ndarray, free: np.ndarray):
+        """
+        Add the binary (bitwise) at-most-one encoding over the `free` variables
+        of each row of `groups`.
+
+        Each variable is tied to the bit pattern of its index over
+        ceil(log2(n)) auxiliary variables, so two true variables would need the
+        same pattern. This takes n * ceil(log2(n)) clauses instead of the
+        n * (n - 1) / 2 of the pairwise encoding.
+        """
+        if len(groups) == 0:
+            return
+        # Index of each remaining variable within its group
+        indices = np.cumsum(free, axis=1) - 1
+        num_bits = np.frompyfunc(int.bit_length, 1, 1)(
+            np.maximum(free.sum(axis=1) - 1, 0)
+        ).astype(np.int64)
+        if not num_bits.any():
+            return
+
+        # Consecutive auxiliary bits per group, allocated in one block
+        first_bit = self.next_var + np.cumsum(num_bits) - num_bits
+        self.next_var += int(num_bits.sum())
+
+        max_bits = int(num_bits.max())
+        bit_positions = np.arange(max_bits)
+        bits = first_bit[:, np.newaxis, np.newaxis] + bit_positions
+        signs = np.where((indices[:, :, np.newaxis] >> bit_positions) & 1, 1, -1)
+        used = free[:, :, np.newaxis] & (
+            bit_positions < num_bits[:, np.newaxis, np.newaxis]
+        )
+
+        clauses = np.stack(
+            (np.broadcast_to(-groups[:, :, np.newaxis], used.shape), signs * bits),
+            axis=-1,
+        )
+        self.add_clauses(clauses[used])
+
+    def _amo_ladder(self, groups: np.ndarray, free: np.ndarray):
+        """
+        Add the ladder (sequential counter) at-most-one encoding over the
+        `free` variables of each row of `groups`.
+
+        Auxiliary s_i means "one of the first i variables is true", which
+        takes n - 1 auxiliaries and 3n - 4 clauses per group of n.
+        """
+        if len(groups) == 0:
+            return
+        # Move the free variables of every row to the front
+        order = np.argsort(~free, axis=1, kind="stable")
+        variables = np.take_along_axis(groups, order, axis=1)
+        counts = free.sum(axis=1)[:, np.newaxis]
+
+        # n - 1 consecutive auxiliaries per group, allocated in one block
+        num_aux = counts - 1
+        first_aux = self.next_var + np.cumsum(num_aux) - num_aux.ravel()
+        self.next_var += int(num_aux.sum())
+        positions = np.arange(groups.shape[1])
+        aux = first_aux[:, np.newaxis] + positions
+        previous = aux - 1
+
+        self.add_clauses(
+            np.concatenate(
+                (
+                    # x_i -> s_i
+                    np.stack((-variables, aux), axis=-1)[positions < num_aux],
+                    # s_(i-1) -> s_i
+                    np.stack((-previous, aux), axis=-1)[
+                        (positions >= 1) & (positions < num_aux)
+                    ],
+                    # s_(i-1) -> not x_i
+                    np.stack((-variables, -previous), axis=-1)[
+                        (positions >= 1) & (positions < counts)
+                    ],
+                )
+            )
+        )
+
+    def goal_assumptions(self, robots: List[Robot], time_horizon: int) -> List[int]:
+        """Return the literals placing every robot on its goal at `time_horizon`."""
+        # Larger steps would silently index the next robot's variables
+        if not 0 <= time_horizon <= self.time_horizon:
+            raise ValueError(
+                f"Time horizon {time_horizon} is outside the encoded range 0..{self.time_horizon}"
+            )
+        return [
+            self.create_variable(robot.id, robot.goal.x, robot.goal.y, time_horizon)
+            for robot in robots
+        ]
+
+    def deadline_assumptions(self, robots: List[Robot], time_horizon: int) -> List[int]:
+        """
+        Return the assumptions placing every robot on its goal at `time_horizon`
+        through a single selector literal.
+
+        The selector implies each goal literal and is allocated once per
+        horizon, so a horizon sweep adds a handful of binary clauses per step
+        and every solve assumes one literal.
+        """
+        goals = self.goal_assumptions(robots, time_horizon)
+        if (self.position_values[np.array(goals) - 1] == 1).all():
+            return []
+        if time_horizon not in self.deadlines:
+            selector = self._new_aux()
+            self.add_clauses([[-selector, goal] for goal in goals])
+            self.deadlines[time_horizon] = selector
+        return [self.deadlines[time_horizon]]
+
+    def solve(self, assumptions: Sequence[int] = ()) -> Optional[List[int]]:
+        """
+        Solve the SAT problem under `assumptions` and return the model (list of
+        literals) if one exists.
+
+        The solver is kept between calls and only receives the clauses added
+        since the previous call, so learnt clauses carry over.
+        """
+        if self.conflict:
             return None
 
-    def decode_solution(self, solution: Dict[str, bool]) -> Dict[int, List[Position]]:
-        """Convert SAT solution to robot paths."""
-        paths = {}
-        for var_name, is_true in solution.items():
-            if is_true:
-                # Parse variable name (format: R{id}X{x}Y{y}T{t})
-                # Remove the letters and split the remaining string
-                numbers = "".join(c if c.isdigit() else " " for c in var_name).split()
-                robot_id, x, y, t = map(int, numbers)
-
-                if robot_id not in paths:
-                    paths[robot_id] = [None] * (self.time_horizon + 1)
-                paths[robot_id][t] = Position(x, y)
+        if self.solver is None:
+            self.solver = self.solver_cls()
+        # The first load takes the clause list as is rather than a sliced copy
+        pending = self.cnf.clauses
+        if self.num_loaded_clauses:
+            pending = pending[self.num_loaded_clauses :]
+        self.solver.append_formula(pending)
+        self.num_loaded_clauses = len(self.cnf.clauses)
+
+        # Fixed values never reach the solver, so assumptions on them are
+        # settled here
+        assumptions = np.asarray(assumptions, dtype=np.int64)
+        variables = np.abs(assumptions)
+        values = np.zeros(len(assumptions), dtype=np.int64)
+        positional = variables <= self.num_position_vars
+        values[positional] = self.position_values[variables[positional] - 1]
+        values *= np.sign(assumptions)
+        if (values == -1).any():
+            return None
+        assumptions = assumptions[values == 0].tolist()
+
+        if self.solver.solve(assumptions=assumptions):
+            model = self.solver.get_model()
+            if not isinstance(model, list):
+                raise ValueError("No model found")
+            return model
+
+        return None
+
+    def close(self):
+        """Release the incremental solver."""
+        if self.solver is not None:
+            self.solver.delete()
+            self.solver = None
+            self.num_loaded_clauses = 0
+
+    def decode_cells(
+        self, model: List[int], time_horizon: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Return the packed cell of every robot at every step of a SAT model, up
+        to `time_horizon` if given, as a (robot, time) array.
+        """
+        if time_horizon is None:
+            time_horizon = self.time_horizon
+        # Scatter the true position literals into the (robot, time, cell)
+        # layout; auxiliaries come after the position variables
+        literals = np.asarray(model, dtype=np.int64)
+        occupied = np.zeros(self.num_position_vars, dtype=bool)
+        occupied[
+            literals[(literals > 0) & (literals <= self.num_position_vars)] - 1
+        ] = True
+        # Fixed values never reach the solver, so they override the model
+        occupied = np.where(
+            self.position_values != 0, self.position_values == 1, occupied
+        )
+        occupied = occupied.reshape(self.position_vars.shape)[:, : time_horizon + 1]
 
         # Verify paths are complete
-        for path in paths.values():
-            if None in path:
-                raise ValueError("Invalid solution: incomplete path detected")
-
-        return paths
+        if not occupied.any(axis=2).all():
+            raise ValueError("Invalid solution: incomplete path detected")
+        return occupied.argmax(axis=2)
+
+    def cells_to_paths(self, cells: np.ndarray) -> Dict[int, List[Position]]:
+        """Convert a (robot, time) array of packed cells to robot paths."""
+        xs, ys = np.divmod(cells, self.height)
+        return {
+            robot.id: [Position.of(x, y) for x, y in zip(row_x, row_y)]
+            for robot, row_x, row_y in zip(self.robots, xs.tolist(), ys.tolist())
+        }
+
+    def add_conflict_constraints(self, cells: np.ndarray) -> bool:
+        """
+        Rule out the collisions and position switches found in `cells`, a
+        (robot, time) array of packed cells, and return whether any was found.
+
+        A collision adds the at-most-one constraint of its (time, cell) for all
+        robots; a switch forbids that pair of robots from swapping along that
+        edge at that step.
+        """
+        num_steps = cells.shape[1]
+        first, second = np.triu_indices(len(cells), 1)
+        times = np.arange(num_steps)
+
+        same = cells[first] == cells[second]
+        collision_times, collision_cells = np.unique(
+            np.stack((np.broadcast_to(times, same.shape)[same], cells[first][same])),
+            axis=1,
+        )
+        self._at_most_one(self.position_vars[:, collision_times, collision_cells].T)
+
+        before, after = cells[:, :-1], cells[:, 1:]
+        swapped = (
+            (before[first] == after[second])
+            & (after[first] == before[second])
+            & (before[first] != after[first])
+        )
+        pairs, steps = np.nonzero(swapped)
+        i, j = first[pairs], second[pairs]
+        u, v = before[i, steps], after[i, steps]
+        self.add_clauses(
+            -np.stack(
+                (
+                    self.position_vars[i, steps, u],
+                    self.position_vars[i, steps + 1, v],
+                    self.position_vars[j, steps, v],
+                    self.position_vars[j, steps + 1, u],
+                ),
+                axis=-1,
+            )
+        )
+        return bool(same.any() or swapped.any())
+
+    def solve_paths(
+        self, assumptions: Sequence[int] = (), time_horizon: Optional[int] = None
+    ) -> Optional[Dict[int, List[Position]]]:
+        """
+        Solve under `assumptions` and return the robot paths, up to
+        `time_horizon` if given, if a solution exists.
+
+        When collision and switching constraints were left out of the encoding,
+        they are added on demand: each round rules out the conflicts found in
+        the paths on the same incremental solver, until the paths are
+        conflict-free or the problem becomes unsolvable.
+        """
+        while True:
+            model = self.solve(assumptions)
+            if model is None:
+                return None
+            cells = self.decode_cells(model, time_horizon)
+            if not self.add_conflict_constraints(cells):
+                return self.cells_to_paths(cells)